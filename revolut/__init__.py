@@ -3,11 +3,19 @@
 This package allows you to communicate with your Revolut accounts
 """
 
-import base64
+import binascii
+import copy
 from datetime import datetime
 import json
+from operator import itemgetter
 import requests
-from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+import time
+
+try:
+    import orjson  # Optional, faster JSON encoding/decoding
+except ImportError:
+    orjson = None
 
 __version__ = '0.1.4'  # Should be the same in setup.py
 
@@ -15,27 +23,58 @@ API_BASE = "https://api.revolut.com"
 _URL_GET_ACCOUNTS = API_BASE + "/user/current/wallet"
 _URL_GET_TRANSACTIONS_LAST = API_BASE + "/user/current/transactions/last"
 _URL_QUOTE = API_BASE + "/quote/"
+_URL_QUOTE_TEMPLATE = _URL_QUOTE + "{from_currency}{to_currency}" \
+                                   "?amount={amount}&side=SELL"
 _URL_EXCHANGE = API_BASE + "/exchange"
 _URL_GET_TOKEN_STEP1 = API_BASE + "/signin"
 _URL_GET_TOKEN_STEP2 = API_BASE + "/signin/confirm"
 
 _DEFAULT_TOKEN_FOR_SIGNIN = "QXBwOlM5V1VuU0ZCeTY3Z1dhbjc="
 
-_AVAILABLE_CURRENCIES = ["USD", "RON", "HUF", "CZK", "GBP", "CAD", "THB",
+# First bytes of the image files accepted as selfie
+_JPEG_SIGNATURE = b"\xff\xd8\xff"
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# How long (in seconds) a response can be reused without calling Revolut
+_WALLET_ID_CACHE_TTL = 600
+_QUOTE_CACHE_TTL = 5
+
+# frozenset: checked on every Amount creation
+_AVAILABLE_CURRENCIES = frozenset([
+                         "USD", "RON", "HUF", "CZK", "GBP", "CAD", "THB",
                          "SGD", "CHF", "AUD", "ILS", "DKK", "PLN", "MAD",
                          "AED", "EUR", "JPY", "ZAR", "NZD", "HKD", "TRY",
                          "QAR", "NOK", "SEK", "BTC", "ETH", "XRP", "BCH",
                          "LTC", "SAR", "RUB", "RSD", "MXN", "ISK", "HRK",
                          "BGN", "XAU", "IDR", "INR", "MYR", "PHP", "XLM",
-                         "EOS", "OMG", "XTZ", "ZRX"]
+                         "EOS", "OMG", "XTZ", "ZRX"])
 
 _VAULT_ACCOUNT_TYPE = "SAVINGS"
+# Account names (ex : "EUR CURRENT", "EUR SAVINGS (My vault)")
+_ACCOUNT_NAME_FORMAT = "%s %s"
+_VAULT_ACCOUNT_NAME_FORMAT = "%s %s (%s)"
 _ACTIVE_ACCOUNT = "ACTIVE"
 _TRANSACTION_COMPLETED = "COMPLETED"
 _TRANSACTION_FAILED = "FAILED"
 _TRANSACTION_PENDING = "PENDING"
 _TRANSACTION_REVERTED = "REVERTED"
 _TRANSACTION_DECLINED = "DECLINED"
+# Dates of AccountTransactions.csv() (fr and en)
+_CSV_DATE_FORMAT_FR = "%d/%m/%Y %H:%M:%S"
+_CSV_DATE_FORMAT_EN = "%m/%d/%Y %H:%M:%S"
+# Same output as time.strftime for these formats, filled with a
+# time.struct_time, but faster
+_DATE_TEMPLATES = {
+    _CSV_DATE_FORMAT_FR: "{2:02d}/{1:02d}/{0:04d} {3:02d}:{4:02d}:{5:02d}",
+    _CSV_DATE_FORMAT_EN: "{1:02d}/{2:02d}/{0:04d} {3:02d}:{4:02d}:{5:02d}",
+}
+_TRANSACTION_REQUIRED_FIELDS = itemgetter("currency", "amount", "account")
+# Transactions not exported by AccountTransactions.csv()
+_TRANSACTION_IGNORED_STATES = frozenset([
+    _TRANSACTION_DECLINED,
+    _TRANSACTION_FAILED,
+    _TRANSACTION_REVERTED,
+])
 
 
 # The amounts are stored as integer on Revolut.
@@ -50,22 +89,135 @@ _SCALE_FACTOR_CURRENCY_DICT = {
                                 "LTC": 100000000,
                                }
 
+# Format spec used to display a real amount, depending on the currency
+_DEFAULT_AMOUNT_FORMAT = ".2f"
+_AMOUNT_FORMAT_CURRENCY_DICT = {
+                                "BTC": ".8f",
+                                "ETH": ".8f",
+                                "BCH": ".8f",
+                                "XRP": ".8f",
+                                "LTC": ".8f",
+                               }
+
+# Response of the exchange endpoint, returned by Revolut.exchange() in
+# simulation mode
+_SIMU_EXCHANGE = [
+    {
+        "account": {"id": "FAKE_ID"},
+        "amount": -1,
+        "balance": 0,
+        "completedDate": 123456789,
+        "counterpart": {
+            "account": {"id": "FAKE_ID"},
+            "amount": 170,
+            "currency": "BTC",
+        },
+        "currency": "EUR",
+        "description": "Exchanged to BTC",
+        "direction": "sell",
+        "fee": 0,
+        "id": "FAKE_ID",
+        "legId": "FAKE_ID",
+        "rate": 0.0001751234,
+        "startedDate": 123456789,
+        "state": "COMPLETED",
+        "type": "EXCHANGE",
+        "updatedDate": 123456789,
+    },
+    {
+        "account": {"id": "FAKE_ID"},
+        "amount": 170,
+        "balance": 12345,
+        "completedDate": 12345678,
+        "counterpart": {
+            "account": {"id": "FAKE_ID"},
+            "amount": -1,
+            "currency": "EUR",
+        },
+        "currency": "BTC",
+        "description": "Exchanged from EUR",
+        "direction": "buy",
+        "fee": 0,
+        "id": "FAKE_ID",
+        "legId": "FAKE_ID",
+        "rate": 5700.0012345,
+        "startedDate": 123456789,
+        "state": "COMPLETED",
+        "type": "EXCHANGE",
+        "updatedDate": 123456789,
+    },
+]
+
+# Response of the sign-in confirmation endpoint, returned by
+# get_token_step2() in simulation mode
+_SIMU_GET_TOKEN = {
+    "user": {
+        "id": "fakeuserid",
+        "createdDate": 123456789,
+        "address": {
+            "city": "my_city",
+            "country": "FR",
+            "postcode": "12345",
+            "region": "my_region",
+            "streetLine1": "1 rue mon adresse",
+            "streetLine2": "Appt 1",
+        },
+        "birthDate": [1980, 1, 1],
+        "firstName": "John",
+        "lastName": "Doe",
+        "phone": "+33612345678",
+        "email": "myemail@email.com",
+        "emailVerified": False,
+        "state": "ACTIVE",
+        "referralCode": "refcode",
+        "kyc": "PASSED",
+        "termsVersion": "2018-05-25",
+        "underReview": False,
+        "riskAssessed": False,
+        "locale": "en-GB",
+    },
+    "wallet": {
+        "id": "wallet_id",
+        "ref": "12345678",
+        "state": "ACTIVE",
+        "baseCurrency": "EUR",
+        "topupLimit": 3000000,
+        "totalTopup": 0,
+        "topupResetDate": 123456789,
+        "pockets": [{
+            "id": "pocket_id",
+            "type": "CURRENT",
+            "state": "ACTIVE",
+            "currency": "EUR",
+            "balance": 100,
+            "blockedAmount": 0,
+            "closed": False,
+            "creditLimit": 0,
+        }],
+    },
+    "accessToken": "myaccesstoken",
+}
+
 
 class Amount:
     """ Class to handle the Revolut amount with currencies """
+    __slots__ = ('currency', 'revolut_amount', 'real_amount',
+                 'real_amount_str')
+
     def __init__(self, currency, revolut_amount=None, real_amount=None):
         if currency not in _AVAILABLE_CURRENCIES:
             raise KeyError(currency)
         self.currency = currency
 
         if revolut_amount is not None:
-            if type(revolut_amount) != int:
+            if type(revolut_amount) is not int:  # bool is not accepted
                 raise TypeError(type(revolut_amount))
             self.revolut_amount = revolut_amount
             self.real_amount = self.get_real_amount()
 
         elif real_amount is not None:
-            if type(real_amount) not in [float, int]:
+            if not isinstance(real_amount, (float, int)) \
+                    or isinstance(real_amount, bool):
                 raise TypeError(type(real_amount))
             self.real_amount = float(real_amount)
             self.revolut_amount = self.get_revolut_amount()
@@ -74,14 +226,30 @@ class Amount:
 
         self.real_amount_str = self.get_real_amount_str()
 
+    @classmethod
+    def from_revolut(cls, currency, revolut_amount):
+        """ Build an Amount from a Revolut amount, as returned by the API
+        >>> Amount.from_revolut("EUR", 150)
+        Amount(real_amount=1.5, currency='EUR')
+        """
+        if currency not in _AVAILABLE_CURRENCIES:
+            raise KeyError(currency)
+        if revolut_amount is None:
+            raise ValueError("revolut_amount must be set")
+        if type(revolut_amount) is not int:  # bool is not accepted
+            raise TypeError(type(revolut_amount))
+        amount = cls.__new__(cls)
+        amount.currency = currency
+        amount.revolut_amount = revolut_amount
+        amount.real_amount = amount.get_real_amount()
+        amount.real_amount_str = amount.get_real_amount_str()
+        return amount
+
     def get_real_amount_str(self):
         """ Get the real amount with the proper format, without currency """
-        if self.currency in ["BTC", "ETH", "BCH", "XRP", "LTC"]:
-            digits_after_float = 8
-        else:
-            digits_after_float = 2
-
-        return("%.*f" % (digits_after_float, self.real_amount))
+        amount_format = _AMOUNT_FORMAT_CURRENCY_DICT.get(
+                self.currency, _DEFAULT_AMOUNT_FORMAT)
+        return format(self.real_amount, amount_format)
 
     def __str__(self):
         return('{} {}'.format(self.real_amount_str, self.currency))
@@ -113,12 +281,14 @@ class Amount:
 
 class Transaction:
     """ Class to handle an exchange transaction """
+    __slots__ = ('from_amount', 'to_amount', 'date')
+
     def __init__(self, from_amount, to_amount, date):
-        if type(from_amount) != Amount:
+        if not isinstance(from_amount, Amount):
             raise TypeError
-        if type(to_amount) != Amount:
+        if not isinstance(to_amount, Amount):
             raise TypeError
-        if type(date) != datetime:
+        if not isinstance(date, datetime):
             raise TypeError
         self.from_amount = from_amount
         self.to_amount = to_amount
@@ -134,6 +304,10 @@ class Client:
     """ Do the requests with the Revolut servers """
     def __init__(self, token, device_id):
         self.session = requests.session()
+        # All the calls go to the same host : keep a small pool of
+        # kept-alive connections for it
+        self.session.mount(API_BASE, HTTPAdapter(pool_connections=1,
+                                                 pool_maxsize=4))
         self.session.headers = {
                     'Host': 'api.revolut.com',
                     'X-Api-Version': '1',
@@ -142,6 +316,7 @@ class Client:
                     'User-Agent': 'Revolut/5.5 500500250 (CLI; Android 4.4.2)',
                     'Authorization': 'Basic '+token,
                     }
+        self._cache = {}
 
     def _get(self, url, *, expected_status_code=200, **kwargs):
         ret = self.session.get(url=url, **kwargs)
@@ -151,7 +326,34 @@ class Client:
                     ret.status_code, url, ret.text))
         return ret
 
-    def _post(self, url, *, expected_status_code=200, **kwargs):
+    def _get_cached(self, url, *, ttl):
+        """ Same as _get, but reuses the response for this url
+        if it is less than ttl seconds old. Errors are not cached """
+        now = time.monotonic()
+        cached = self._cache.get(url)
+        if cached is not None and now < cached[0]:
+            return cached[1]
+        ret = self._get(url)
+        self._store_cached(url, ret, ttl=ttl)
+        return ret
+
+    def _store_cached(self, url, ret, *, ttl):
+        """ Store a response for url, to be reused by _get_cached
+        for ttl seconds """
+        now = time.monotonic()
+        # Drop the expired responses, so that the cache does not grow
+        # with every quoted currency pair
+        self._cache = {cached_url: cached
+                       for cached_url, cached in self._cache.items()
+                       if now < cached[0]}
+        self._cache[url] = (now + ttl, ret)
+
+    def _post(self, url, *, expected_status_code=200, json_body=None,
+              **kwargs):
+        if json_body is not None:
+            kwargs["data"] = json_dumps(json_body)
+            kwargs["headers"] = {"Content-Type": "application/json",
+                                 **(kwargs.get("headers") or {})}
         ret = self.session.post(url=url, **kwargs)
         if ret.status_code != expected_status_code:
             raise ConnectionError(
@@ -168,17 +370,21 @@ class Revolut:
         """ Get the account balance for each currency
         and returns it as a dict {"balance":XXXX, "currency":XXXX} """
         ret = self.client._get(_URL_GET_ACCOUNTS)
-        raw_accounts = ret.json()
+        # Same endpoint as get_wallet_id() : let it reuse this response
+        self.client._store_cached(_URL_GET_ACCOUNTS, ret,
+                                  ttl=_WALLET_ID_CACHE_TTL)
+        raw_accounts = _json_loads(ret)
 
         account_balances = []
         for raw_account in raw_accounts.get("pockets"):
+            raw_get = raw_account.get
             account_balances.append({
-                "balance": raw_account.get("balance"),
-                "currency": raw_account.get("currency"),
-                "type": raw_account.get("type"),
-                "state": raw_account.get("state"),
+                "balance": raw_get("balance"),
+                "currency": raw_get("currency"),
+                "type": raw_get("type"),
+                "state": raw_get("state"),
                 # name is present when the account is a vault (type = SAVINGS)
-                "vault_name": raw_account.get("name", ""),
+                "vault_name": raw_get("name", ""),
             })
         self.account_balances = Accounts(account_balances)
         return self.account_balances
@@ -188,45 +394,48 @@ class Revolut:
         raw_transactions = []
         params = {}
         if to_date:
-            params['to'] = int(to_date.timestamp()) * 1000
+            params['to'] = _timestamp_ms(to_date)
         if from_date:
-            params['from'] = int(from_date.timestamp()) * 1000
+            params['from'] = _timestamp_ms(from_date)
 
         while True:
             ret = self.client._get(_URL_GET_TRANSACTIONS_LAST, params=params)
-            ret_transactions = ret.json()
+            ret_transactions = _json_loads(ret)
             if not ret_transactions:
                 break
-            params['to'] = ret_transactions[-1]['startedDate']
             raw_transactions.extend(ret_transactions)
-        
+            params['to'] = ret_transactions[-1]['startedDate']
+            if from_date and params['to'] <= params['from']:
+                break  # No need to ask for a page starting before from_date
+
         return AccountTransactions(raw_transactions)
 
     def get_wallet_id(self):
         """ Get the main wallet_id """
-        ret = self.client._get(_URL_GET_ACCOUNTS)
-        raw = ret.json()
+        ret = self.client._get_cached(_URL_GET_ACCOUNTS,
+                                      ttl=_WALLET_ID_CACHE_TTL)
+        raw = _json_loads(ret)
         return raw.get('id')
 
     def quote(self, from_amount, to_currency):
-        if type(from_amount) != Amount:
+        if not isinstance(from_amount, Amount):
             raise TypeError("from_amount must be with the Amount type")
 
         if to_currency not in _AVAILABLE_CURRENCIES:
             raise KeyError(to_currency)
 
-        url_quote = urljoin(_URL_QUOTE, '{}{}?amount={}&side=SELL'.format(
-            from_amount.currency,
-            to_currency,
-            from_amount.revolut_amount))
-        ret = self.client._get(url_quote)
-        raw_quote = ret.json()
-        quote_obj = Amount(revolut_amount=raw_quote["to"]["amount"],
-                           currency=to_currency)
+        url_quote = _URL_QUOTE_TEMPLATE.format(
+            from_currency=from_amount.currency,
+            to_currency=to_currency,
+            amount=from_amount.revolut_amount)
+        ret = self.client._get_cached(url_quote, ttl=_QUOTE_CACHE_TTL)
+        raw_quote = _json_loads(ret)
+        quote_obj = Amount.from_revolut(currency=to_currency,
+                                        revolut_amount=raw_quote["to"]["amount"])
         return quote_obj
 
     def exchange(self, from_amount, to_currency, simulate=False):
-        if type(from_amount) != Amount:
+        if not isinstance(from_amount, Amount):
             raise TypeError("from_amount must be with the Amount type")
 
         if to_currency not in _AVAILABLE_CURRENCIES:
@@ -242,36 +451,16 @@ class Revolut:
         if simulate:
             # Because we don't want to exchange currencies
             # for every test ;)
-            simu = '[{"account":{"id":"FAKE_ID"},\
-            "amount":-1,"balance":0,"completedDate":123456789,\
-            "counterpart":{"account":\
-            {"id":"FAKE_ID"},\
-            "amount":170,"currency":"BTC"},"currency":"EUR",\
-            "description":"Exchanged to BTC","direction":"sell",\
-            "fee":0,"id":"FAKE_ID",\
-            "legId":"FAKE_ID","rate":0.0001751234,\
-            "startedDate":123456789,"state":"COMPLETED","type":"EXCHANGE",\
-            "updatedDate":123456789},\
-            {"account":{"id":"FAKE_ID"},"amount":170,\
-            "balance":12345,"completedDate":12345678,"counterpart":\
-            {"account":{"id":"FAKE_ID"},\
-            "amount":-1,"currency":"EUR"},"currency":"BTC",\
-            "description":"Exchanged from EUR","direction":"buy","fee":0,\
-            "id":"FAKE_ID",\
-            "legId":"FAKE_ID",\
-            "rate":5700.0012345,"startedDate":123456789,\
-            "state":"COMPLETED","type":"EXCHANGE",\
-            "updatedDate":123456789}]'
-            raw_exchange = json.loads(simu)
+            raw_exchange = _SIMU_EXCHANGE
         else:
-            ret = self.client._post(_URL_EXCHANGE, json=data)
-            raw_exchange = ret.json()
+            ret = self.client._post(_URL_EXCHANGE, json_body=data)
+            raw_exchange = _json_loads(ret)
 
         if raw_exchange[0]["state"] == "COMPLETED":
             amount = raw_exchange[0]["counterpart"]["amount"]
             currency = raw_exchange[0]["counterpart"]["currency"]
-            exchanged_amount = Amount(revolut_amount=amount,
-                                      currency=currency)
+            exchanged_amount = Amount.from_revolut(currency=currency,
+                                                   revolut_amount=amount)
             exchange_transaction = Transaction(from_amount=from_amount,
                                                to_amount=exchanged_amount,
                                                date=datetime.now())
@@ -283,6 +472,8 @@ class Revolut:
 
 class Account:
     """ Class to handle an account """
+    __slots__ = ('account_type', 'balance', 'state', 'vault_name', 'name')
+
     def __init__(self, account_type, balance, state, vault_name):
         self.account_type = account_type  # CURRENT, SAVINGS
         self.balance = balance
@@ -292,15 +483,10 @@ class Account:
 
     def build_account_name(self):
         if self.account_type == _VAULT_ACCOUNT_TYPE:
-            account_name = '{currency} {type} ({vault_name})'.format(
-                    currency=self.balance.currency,
-                    type=self.account_type,
-                    vault_name=self.vault_name)
-        else:
-            account_name = '{currency} {type}'.format(
-                    currency=self.balance.currency,
-                    type=self.account_type)
-        return account_name
+            return _VAULT_ACCOUNT_NAME_FORMAT % (
+                self.balance.currency, self.account_type, self.vault_name)
+        return _ACCOUNT_NAME_FORMAT % (
+            self.balance.currency, self.account_type)
 
     def __str__(self):
         return "{name} : {balance}".format(name=self.name,
@@ -315,7 +501,7 @@ class Accounts:
         self.list = [
             Account(
                 account_type=account.get("type"),
-                balance=Amount(
+                balance=Amount.from_revolut(
                     currency=account.get("currency"),
                     revolut_amount=account.get("balance"),
                 ),
@@ -324,12 +510,14 @@ class Accounts:
             )
             for account in self.raw_list
         ]
+        # Index by name, keeping the first account when names collide
+        self._by_name = {}
+        for account in self.list:
+            self._by_name.setdefault(account.name, account)
 
     def get_account_by_name(self, account_name):
         """ Get an account by its name """
-        for account in self.list:
-            if account.name == account_name:
-                return account
+        return self._by_name.get(account_name)
 
     def __len__(self):
         return len(self.list)
@@ -342,9 +530,9 @@ class Accounts:
     def csv(self, lang="fr"):
         lang_is_fr = lang == "fr"
         if lang_is_fr:
-            csv_str = "Nom du compte;Solde;Devise"
+            lines = ["Nom du compte;Solde;Devise"]
         else:
-            csv_str = "Account name,Balance,Currency"
+            lines = ["Account name,Balance,Currency"]
 
         # Europe uses 'comma' as decimal separator,
         # so it can't be used as delimiter:
@@ -352,17 +540,25 @@ class Accounts:
 
         for account in self.list:
             if account.state == _ACTIVE_ACCOUNT:  # Do not print INACTIVE
-                csv_str += "\n" + delimiter.join((
+                balance = account.balance
+                balance_str = balance.real_amount_str
+                if lang_is_fr:
+                    balance_str = balance_str.replace(".", ",")
+                lines.append(delimiter.join((
                     account.name,
-                    account.balance.real_amount_str,
-                    account.balance.currency,
-                ))
+                    balance_str,
+                    balance.currency,
+                )))
 
-        return csv_str.replace(".", ",") if lang_is_fr else csv_str
+        return "\n".join(lines)
 
 
 class AccountTransaction:
     """ Class to handle an account transaction """
+    __slots__ = ('transactions_type', 'state', 'started_date',
+                 'completed_date', 'amount', 'fee', 'description',
+                 'account_id')
+
     def __init__(
             self,
             transactions_type,
@@ -389,17 +585,19 @@ class AccountTransaction:
             amount=str(self.amount)
         )
 
-    def get_datetime__str(self, date_format="%d/%m/%Y %H:%M:%S"):
+    def get_timestamp(self):
         """ 'Pending' transactions do not have 'completed_date' yet
-        so return 'started_date' instead """
-        timestamp = self.completed_date if self.completed_date \
-                else self.started_date
-        # Convert from timestamp to datetime
-        dt = datetime.fromtimestamp(
-            timestamp / 1000
-        )
-        dt_str = dt.strftime(date_format)
-        return dt_str
+        so return 'started_date' instead (timestamp in ms) """
+        return self.completed_date if self.completed_date \
+            else self.started_date
+
+    def get_datetime__str(self, date_format=_CSV_DATE_FORMAT_FR):
+        # Format the timestamp (in ms) directly, without a datetime object
+        localtime = time.localtime(self.get_timestamp() // 1000)
+        date_template = _DATE_TEMPLATES.get(date_format)
+        if date_template is None:
+            return time.strftime(date_format, localtime)
+        return date_template.format(*localtime)
 
     def get_description(self):
         # Adding 'pending' for processing transactions
@@ -414,95 +612,179 @@ class AccountTransaction:
 
 
 class AccountTransactions:
-    """ Class to handle the account transactions """
+    """ Class to handle the account transactions
+
+    The AccountTransaction objects are only built when a row is accessed,
+    and are then cached """
 
     def __init__(self, account_transactions):
         self.raw_list = account_transactions
-        self.list = [
-            AccountTransaction(
-                transactions_type=transaction.get("type"),
-                state=transaction.get("state"),
-                started_date=transaction.get("startedDate"),
-                completed_date=transaction.get("completedDate"),
-                amount=Amount(revolut_amount=transaction.get('amount'),
-                              currency=transaction.get('currency')),
-                fee=transaction.get('fee'),
-                description=transaction.get('description'),
-                account_id=transaction.get('account').get('id')
-            )
-            for transaction in self.raw_list
-        ]
+        self._cache = [None] * len(self.raw_list)
+        self._all_built = False
+
+    @staticmethod
+    def _build(transaction):
+        # Fields the row can't be built without : fetch them in one call
+        currency, revolut_amount, account = \
+            _TRANSACTION_REQUIRED_FIELDS(transaction)
+        get = transaction.get
+        return AccountTransaction(
+            transactions_type=get("type"),
+            state=get("state"),
+            started_date=get("startedDate"),
+            completed_date=get("completedDate"),
+            amount=Amount.from_revolut(
+                currency=currency,
+                revolut_amount=revolut_amount),
+            fee=get('fee'),
+            description=get('description'),
+            account_id=account.get('id')
+        )
+
+    @property
+    def list(self):
+        """ All the AccountTransaction objects, built on first access.
+        The same list is returned afterwards """
+        if not self._all_built:
+            for i, account_transaction in enumerate(self._cache):
+                if account_transaction is None:
+                    self._cache[i] = self._build(self.raw_list[i])
+            self._all_built = True
+        return self._cache
+
+    @list.setter
+    def list(self, account_transactions):
+        """ Replace the transactions by a list of AccountTransaction """
+        self._cache = account_transactions
+        self._all_built = True
 
     def __len__(self):
-        return len(self.list)
+        return len(self._cache)
+
+    def __getitem__(self, key):
+        """ Method to access the object as a list
+        (ex : transactions[1]) """
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+        account_transaction = self._cache[key]
+        if account_transaction is None:
+            account_transaction = self._build(self.raw_list[key])
+            self._cache[key] = account_transaction
+        return account_transaction
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
 
     def csv(self, lang="fr", reverse=False):
+        return "\n".join(self._csv_lines(lang=lang, reverse=reverse))
+
+    def write_csv(self, fileobj, lang="fr", reverse=False):
+        """ Write the csv to a file object (ex : sys.stdout) line by line,
+        instead of building the whole string like csv() """
+        for line in self._csv_lines(lang=lang, reverse=reverse):
+            fileobj.write(line + "\n")
+
+    def _csv_lines(self, lang, reverse):
         lang_is_fr = lang == "fr"
         if lang_is_fr:
-            csv_str = "Date-heure (DD/MM/YYYY HH:MM:ss);Description;Montant;Devise"
-            date_format = "%d/%m/%Y %H:%M:%S"
+            yield "Date-heure (DD/MM/YYYY HH:MM:ss);Description;Montant;Devise"
+            date_format = _CSV_DATE_FORMAT_FR
         else:
-            csv_str = "Date-time (MM/DD/YYYY HH:MM:ss),Description,Amount,Currency"
-            date_format = "%m/%d/%Y %H:%M:%S"
+            yield "Date-time (MM/DD/YYYY HH:MM:ss),Description,Amount,Currency"
+            date_format = _CSV_DATE_FORMAT_EN
 
         # Europe uses 'comma' as decimal separator,
         # so it can't be used as delimiter:
         delimiter = ";" if lang_is_fr else ","
 
         # Do not export declined or failed payments
-        transaction_list = list(reversed(self.list)) if reverse else self.list
-        for account_transaction in transaction_list:
-            if account_transaction.state not in [
-                    _TRANSACTION_DECLINED,
-                    _TRANSACTION_FAILED,
-                    _TRANSACTION_REVERTED
-                ]:
-
-                csv_str += "\n" + delimiter.join((
-                    account_transaction.get_datetime__str(date_format),
-                    account_transaction.get_description(),
-                    account_transaction.get_amount__str(),
-                    account_transaction.amount.currency
-                ))
-        return csv_str.replace(".", ",") if lang_is_fr else csv_str
-
-
-def get_token_step1(device_id, phone, password, simulate=False):
+        indexes = range(len(self))
+        if reverse:
+            indexes = reversed(indexes)
+        raw_list = self.raw_list
+        cache = self._cache
+        join = delimiter.join
+        for i in indexes:
+            account_transaction = cache[i]
+            if account_transaction is None:
+                # Filter on the raw state to skip building ignored ones
+                if raw_list[i].get("state") in _TRANSACTION_IGNORED_STATES:
+                    continue
+                account_transaction = self[i]
+            elif account_transaction.state in _TRANSACTION_IGNORED_STATES:
+                continue
+            amount = account_transaction.amount
+            amount_str = str(amount.real_amount)
+            if lang_is_fr:
+                amount_str = amount_str.replace(".", ",")
+            yield join((
+                account_transaction.get_datetime__str(date_format),
+                account_transaction.get_description(),
+                amount_str,
+                amount.currency
+            ))
+
+
+def json_dumps(obj):
+    """ Encode obj as JSON bytes, with orjson when it is installed.
+    Same compact UTF-8 output with the json module
+    >>> json_dumps({"a": 1, "b": "é"}).decode("utf-8")
+    '{"a":1,"b":"é"}'
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"),
+                      ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(ret):
+    """ Decode the JSON content of a response,
+    with orjson when it is installed """
+    if orjson is not None:
+        return orjson.loads(ret.content)
+    return ret.json()
+
+
+def _timestamp_ms(date):
+    """ Convert a datetime to a timestamp in milliseconds, as used by the API
+    >>> from datetime import timezone
+    >>> _timestamp_ms(datetime(2020, 1, 1, 0, 0, 0, 500000, timezone.utc))
+    1577836800500
+    """
+    return int(date.timestamp()) * 1000 + date.microsecond // 1000
+
+
+def get_signin_client(device_id):
+    """ Client for the sign-in steps. Create it once and pass it to each
+    step, so that they reuse the same connection """
+    return Client(device_id=device_id, token=_DEFAULT_TOKEN_FOR_SIGNIN)
+
+
+def get_token_step1(device_id, phone, password, simulate=False,
+                    client=None):
     """ Function to obtain a Revolut token (step 1 : send a code by sms/email) """
     if simulate:
         return "SMS"
-    c = Client(device_id=device_id, token=_DEFAULT_TOKEN_FOR_SIGNIN)
+    c = client if client is not None else get_signin_client(device_id)
     data = {"phone": phone, "password": password}
-    ret = c._post(_URL_GET_TOKEN_STEP1, json=data)
-    channel = ret.json().get("channel")
+    ret = c._post(_URL_GET_TOKEN_STEP1, json_body=data)
+    channel = _json_loads(ret).get("channel")
     return channel
 
 
-def get_token_step2(device_id, phone, code, simulate=False):
+def get_token_step2(device_id, phone, code, simulate=False, client=None):
     """ Function to obtain a Revolut token (step 2 : with code) """
     if simulate:
         # Because we don't want to receive a code through sms
         # for every test ;)
-        simu = '{"user":{"id":"fakeuserid","createdDate":123456789,\
-        "address":{"city":"my_city","country":"FR","postcode":"12345",\
-        "region":"my_region","streetLine1":"1 rue mon adresse",\
-        "streetLine2":"Appt 1"},\"birthDate":[1980,1,1],"firstName":"John",\
-        "lastName":"Doe","phone":"+33612345678","email":"myemail@email.com",\
-        "emailVerified":false,"state":"ACTIVE","referralCode":"refcode",\
-        "kyc":"PASSED","termsVersion":"2018-05-25","underReview":false,\
-        "riskAssessed":false,"locale":"en-GB"},"wallet":{"id":"wallet_id",\
-        "ref":"12345678","state":"ACTIVE","baseCurrency":"EUR",\
-        "topupLimit":3000000,"totalTopup":0,"topupResetDate":123456789,\
-        "pockets":[{"id":"pocket_id","type":"CURRENT","state":"ACTIVE",\
-        "currency":"EUR","balance":100,"blockedAmount":0,"closed":false,\
-        "creditLimit":0}]},"accessToken":"myaccesstoken"}'
-        raw_get_token = json.loads(simu)
+        raw_get_token = copy.deepcopy(_SIMU_GET_TOKEN)
     else:
-        c = Client(device_id=device_id, token=_DEFAULT_TOKEN_FOR_SIGNIN)
+        c = client if client is not None else get_signin_client(device_id)
         code = code.replace("-", "")  # If the user would put -
         data = {"phone": phone, "code": code}
-        ret = c._post(_URL_GET_TOKEN_STEP2, json=data)
-        raw_get_token = ret.json()
+        ret = c._post(_URL_GET_TOKEN_STEP2, json_body=data)
+        raw_get_token = _json_loads(ret)
     return raw_get_token
 
 
@@ -510,16 +792,28 @@ def extract_token(json_response):
     user_id = json_response["user"]["id"]
     access_token = json_response["accessToken"]
     token_to_encode = "{}:{}".format(user_id, access_token).encode("ascii")
-    # Ascii encoding required by b64encode function : 8 bits char as input
-    token = base64.b64encode(token_to_encode)
+    # Ascii encoding required by b2a_base64 function : 8 bits char as input
+    token = binascii.b2a_base64(token_to_encode, newline=False)
     return token.decode("ascii")
 
 
-def signin_biometric(device_id, phone, access_token, selfie_filepath):
-    files = {"selfie": open(selfie_filepath, "rb")}
-    c = Client(device_id=device_id, token=_DEFAULT_TOKEN_FOR_SIGNIN)
-    c.session.auth = (phone, access_token)
-    res = c._post(API_BASE + "/biometric-signin/selfie", files=files)
-    biometric_id = res.json()["id"]
-    res = c._post(API_BASE + "/biometric-signin/confirm/" + biometric_id)
-    return res.json()
+def signin_biometric(device_id, phone, access_token, selfie_filepath,
+                     client=None):
+    c = client if client is not None else get_signin_client(device_id)
+    # Per request auth : the client is shared with the other sign-in steps
+    auth = (phone, access_token)
+    with open(selfie_filepath, "rb") as selfie_file:
+        # Sniff the image signature rather than decoding the whole file,
+        # to fail before any upload
+        header = selfie_file.read(len(_PNG_SIGNATURE))
+        if not header.startswith((_JPEG_SIGNATURE, _PNG_SIGNATURE)):
+            raise ValueError(
+                "The selfie must be a JPEG or PNG image : {}".format(
+                    selfie_filepath))
+        selfie_file.seek(0)
+        res = c._post(API_BASE + "/biometric-signin/selfie",
+                      files={"selfie": selfie_file}, auth=auth)
+    biometric_id = _json_loads(res)["id"]
+    res = c._post(API_BASE + "/biometric-signin/confirm/" + biometric_id,
+                  auth=auth)
+    return _json_loads(res)
@@ -92,9 +92,10 @@ def get_amount_with_margin(amount, percent_margin):
 currency="EUR"), percent_margin=1))
 101.00 EUR
 """
-    if type(amount) != Amount:
+    if not isinstance(amount, Amount):
         raise TypeError
-    if type(percent_margin) not in [float, int]:
+    if not isinstance(percent_margin, (float, int)) \
+            or isinstance(percent_margin, bool):
         raise TypeError
     margin = percent_margin/100
 
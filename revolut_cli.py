@@ -6,7 +6,7 @@ from getpass import getpass
 import uuid
 import sys
 
-from revolut import Revolut, __version__, get_token_step1, get_token_step2, signin_biometric, extract_token
+from revolut import Revolut, __version__, get_token_step1, get_token_step2, signin_biometric, extract_token, get_signin_client
 
 # Usage : revolut_cli.py --help
 
@@ -68,10 +68,13 @@ def get_token(device_id):
         "account) [ex : +33612345678] ? ")
     password = getpass(
         "What is your Revolut app password [ex: 1234] ? ")
+    # Same client (and connection) for all the sign-in steps
+    client = get_signin_client(device_id)
     verification_channel = get_token_step1(
         device_id=device_id,
         phone=phone,
-        password=password
+        password=password,
+        client=client,
     )
 
     if verification_channel.upper() == "EMAIL":
@@ -89,6 +92,7 @@ def get_token(device_id):
         device_id=device_id,
         phone=phone,
         code=code,
+        client=client,
     )
 
     if "thirdFactorAuthAccessToken" in response:
@@ -98,7 +102,7 @@ def get_token(device_id):
         selfie_filepath = input(
             "Provide a selfie image file path (800x600) [ex : selfie.png] ")
         response = signin_biometric(
-            device_id, phone, access_token, selfie_filepath)
+            device_id, phone, access_token, selfie_filepath, client=client)
 
     token = extract_token(response)
     token_str = "Your token is {}".format(token)
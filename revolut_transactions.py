@@ -2,13 +2,13 @@
 # -*- coding: utf-8 -*-
 
 import click
-import json
 import os
+import sys
 
 from datetime import datetime
 from datetime import timedelta
 
-from revolut import Revolut, __version__
+from revolut import Revolut, __version__, json_dumps
 
 
 @click.command()
@@ -57,12 +57,18 @@ def main(device_id, token, language, from_date, output_format, reverse):
     rev = Revolut(device_id=device_id, token=token)
     account_transactions = rev.get_account_transactions(from_date)
     if output_format == 'csv':
-        print(account_transactions.csv(lang=language, reverse=reverse))
+        account_transactions.write_csv(sys.stdout, lang=language,
+                                       reverse=reverse)
     elif output_format == 'json':
         transactions = account_transactions.raw_list
         if reverse:
-            transactions = reversed(transactions)
-        print(json.dumps(transactions))
+            # A list is required : neither encoder accepts an iterator
+            transactions = transactions[::-1]
+        # Same UTF-8 output whether orjson is installed or not : write the
+        # bytes, whatever the encoding of the console
+        sys.stdout.flush()
+        sys.stdout.buffer.write(json_dumps(transactions) + b"\n")
+        sys.stdout.buffer.flush()
     else:
         print("output format {!r} not implemented".format(output_format))
         exit(1)
@@ -1,7 +1,11 @@
 from revolut import Amount, Accounts, Account, Transaction, Revolut, Client
-from revolut import get_token_step1, get_token_step2
+from revolut import AccountTransactions, AccountTransaction
+from revolut import get_token_step1, get_token_step2, signin_biometric
+from datetime import datetime
+import json
 import pytest
 import os
+import time
 
 # To be tested with : python -m pytest -vs test/test_revolut.py
 
@@ -56,6 +60,21 @@ def test_class_Amount_errors():
     with pytest.raises(ValueError):
         Amount(currency="BTC")
 
+    with pytest.raises(TypeError):
+        Amount(revolut_amount=True, currency="EUR")
+
+    with pytest.raises(TypeError):
+        Amount(real_amount=True, currency="EUR")
+
+    with pytest.raises(KeyError):
+        Amount.from_revolut(currency="UNKNOWN", revolut_amount=100)
+
+    with pytest.raises(ValueError):
+        Amount.from_revolut(currency="EUR", revolut_amount=None)
+
+    with pytest.raises(TypeError):
+        Amount.from_revolut(currency="EUR", revolut_amount=True)
+
 
 def test_get_account_balances():
     accounts = revolut.get_account_balances()
@@ -205,6 +224,195 @@ EUR SAVINGS (My vault),10.00,EUR"
     account = accounts.get_account_by_name("Not existing")
     assert account is None
 
+    with pytest.raises(TypeError):
+        Accounts([{"balance": True, "currency": "EUR", "type": "CURRENT",
+                   "vault_name": "", "state": "ACTIVE"}])
+
+
+_TRANSACTION_DICTS = [
+    {"type": "CARD_PAYMENT", "state": "COMPLETED",
+     "startedDate": 1570000000000, "completedDate": 1570000100000,
+     "amount": -1234, "currency": "EUR", "fee": 0,
+     "description": "Shop", "account": {"id": "account_id"}},
+    {"type": "CARD_PAYMENT", "state": "PENDING",
+     "startedDate": 1570000200000, "completedDate": None,
+     "amount": -50, "currency": "EUR", "fee": 0,
+     "description": "Cafe", "account": {"id": "account_id"}},
+    {"type": "CARD_PAYMENT", "state": "DECLINED",
+     "startedDate": 1570000300000, "completedDate": None,
+     "amount": -5, "currency": "EUR", "fee": 0,
+     "description": "Declined", "account": {"id": "account_id"}},
+]
+
+
+class _CountingAccountTransactions(AccountTransactions):
+    """ Records which rows are built """
+    def __init__(self, account_transactions):
+        super().__init__(account_transactions)
+        self.built = []
+
+    def _build(self, transaction):
+        self.built.append(transaction["description"])
+        return super()._build(transaction)
+
+
+def test_class_account_transactions():
+    transactions = _CountingAccountTransactions(_TRANSACTION_DICTS)
+    assert len(transactions) == 3
+    # Rows are only built when accessed
+    assert transactions.built == []
+
+    last = transactions[-1]
+    assert type(last) == AccountTransaction
+    assert last.state == "DECLINED"
+    assert last is transactions[2]
+    assert transactions.built == ["Declined"]
+
+    assert [t.description for t in transactions[0:2]] == ["Shop", "Cafe"]
+    assert [t.state for t in transactions] == [
+        "COMPLETED", "PENDING", "DECLINED"]
+    with pytest.raises(IndexError):
+        transactions[3]
+
+    # list is built once, then the same list is returned
+    assert transactions.list is transactions.list
+    assert len(transactions.list) == 3
+    assert transactions.built == ["Declined", "Shop", "Cafe"]
+
+    csv_en = transactions.csv(lang="en").split("\n")
+    assert csv_en[0] == \
+        "Date-time (MM/DD/YYYY HH:MM:ss),Description,Amount,Currency"
+    assert [line.split(",")[1:] for line in csv_en[1:]] == [
+        ["Shop", "-12.34", "EUR"],
+        ["Cafe **pending**", "-0.5", "EUR"]]
+    csv_fr = transactions.csv(lang="fr", reverse=True).split("\n")
+    assert [line.split(";")[1:] for line in csv_fr[1:]] == [
+        ["Cafe **pending**", "-0,5", "EUR"],
+        ["Shop", "-12,34", "EUR"]]
+
+    # Same dates in the csv and with get_datetime__str, as time.strftime
+    first = transactions[0]
+    local_time = time.localtime(1570000100)
+    for date_format in ("%d/%m/%Y %H:%M:%S", "%m/%d/%Y %H:%M:%S", "%Y-%m-%d"):
+        assert first.get_datetime__str(date_format) == \
+            time.strftime(date_format, local_time)
+    assert csv_en[1].split(",")[0] == \
+        first.get_datetime__str("%m/%d/%Y %H:%M:%S")
+    assert csv_fr[2].split(";")[0] == first.get_datetime__str()
+
+    # The csv export does not build the ignored rows
+    transactions = _CountingAccountTransactions(_TRANSACTION_DICTS)
+    transactions.csv(lang="en")
+    assert transactions.built == ["Shop", "Cafe"]
+
+    # list can still be replaced
+    transactions.list = [first]
+    assert len(transactions) == 1
+    assert transactions[0] is first
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = json.dumps(content).encode("utf-8")
+        self.text = self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _FakePagesClient:
+    """ Returns the transaction page matching the 'to' parameter """
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def _get(self, url, **kwargs):
+        to = kwargs["params"].get("to")
+        self.requested.append(to)
+        return _FakeResponse(self.pages[to])
+
+
+def _revolut_with_pages(pages):
+    offline_revolut = Revolut(token="token", device_id="device_id")
+    offline_revolut.client = _FakePagesClient(pages)
+    return offline_revolut
+
+
+def test_get_account_transactions_pages():
+    pages = {
+        None: [{"startedDate": 3000},
+               {"startedDate": 2000}],
+        2000: [{"startedDate": 1000}],
+        1000: [],
+    }
+    offline_revolut = _revolut_with_pages(pages)
+    transactions = offline_revolut.get_account_transactions()
+    assert len(transactions) == 3
+    assert offline_revolut.client.requested == [None, 2000, 1000]
+
+    # Stop as soon as a page reaches from_date
+    offline_revolut = _revolut_with_pages(pages)
+    from_date = datetime.fromtimestamp(2)  # 2000 ms
+    transactions = offline_revolut.get_account_transactions(
+        from_date=from_date)
+    assert len(transactions) == 2
+    assert offline_revolut.client.requested == [None]
+
+
+class _FakeSession:
+    """ Answers every request with the given status code """
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        ret = _FakeResponse({"url": url})
+        ret.status_code = self.status_code
+        return ret
+
+    def post(self, url, **kwargs):
+        self.requested.append(kwargs)
+        return self.get(url)
+
+
+def test_client_get_cached():
+    client = Client(token="token", device_id="device_id")
+    client.session = _FakeSession()
+    ret = client._get_cached("url1", ttl=60)
+    assert client._get_cached("url1", ttl=60) is ret  # Cache hit
+    assert client.session.requested == ["url1"]
+
+    # Expired : requested again, and the expired response is evicted
+    client._get_cached("url2", ttl=0)
+    client._get_cached("url2", ttl=0)
+    assert client.session.requested == ["url1", "url2", "url2"]
+    client._get_cached("url3", ttl=60)
+    assert set(client._cache) == {"url1", "url3"}
+
+    # Errors are not cached
+    client.session = _FakeSession(status_code=500)
+    with pytest.raises(ConnectionError):
+        client._get_cached("url4", ttl=60)
+    assert "url4" not in client._cache
+    with pytest.raises(ConnectionError):
+        client._get_cached("url4", ttl=60)
+    assert client.session.requested == ["url4", "url4"]
+
+
+def test_client_post_json_body():
+    client = Client(token="token", device_id="device_id")
+    client.session = _FakeSession()
+    client._post("url", json_body={"a": 1}, headers=None)
+    client._post("url", json_body={"a": 1}, headers={"X-Test": "1"})
+    sent = client.session.requested[0::2]
+    assert [json.loads(kwargs["data"]) for kwargs in sent] == [{"a": 1}] * 2
+    assert sent[0]["headers"] == {"Content-Type": "application/json"}
+    assert sent[1]["headers"] == {"Content-Type": "application/json",
+                                  "X-Test": "1"}
+
 
 def test_client_errors():
     with pytest.raises(ConnectionError):
@@ -232,6 +440,13 @@ def test_get_token(capsys):
                             code=code,
                             simulate=_SIMU_GET_TOKEN)
     assert token != ""
+
+    if _SIMU_GET_TOKEN is True:
+        # Each simulated response is a new copy
+        token["accessToken"] = "changed"
+        assert get_token_step2(device_id=_DEVICE_ID_TEST, phone=_PHONE,
+                               code=code, simulate=True)["accessToken"] \
+            != "changed"
     print()
     print("Your token is {}".format(token))
 
@@ -247,3 +462,25 @@ def test_get_token(capsys):
         for account in accounts:
             assert type(account) == Amount
             print('{}'.format(account))
+
+
+class _FakeSigninClient:
+    """ Records the sign-in requests instead of sending them """
+    def __init__(self):
+        self.requested = []
+
+    def _post(self, url, **kwargs):
+        self.requested.append(url)
+        return _FakeResponse({"id": "biometric_id"})
+
+
+def test_signin_biometric_errors(tmp_path):
+    selfie_filepath = tmp_path / "selfie.txt"
+    selfie_filepath.write_text("Not an image")
+    client = _FakeSigninClient()
+    with pytest.raises(ValueError):
+        signin_biometric(device_id="device_id", phone="+33612345678",
+                         access_token="access_token",
+                         selfie_filepath=str(selfie_filepath),
+                         client=client)
+    assert client.requested == []  # Nothing was uploaded
@@ -107,6 +107,10 @@ def test_get_amount_with_margin_errors():
         revolut_bot.get_amount_with_margin(
                                 amount=Amount(real_amount=10, currency="USD"),
                                 percent_margin="1%")
+    with pytest.raises(TypeError):
+        revolut_bot.get_amount_with_margin(
+                                amount=Amount(real_amount=10, currency="USD"),
+                                percent_margin=True)
 
 
 def test_convert_Transaction_to_dict():